@@ -0,0 +1,22 @@
+import pandas as pd
+
+SOURCE_FILE = "current_gw_fixtures.xlsx"
+TARGET_FILE = "current_gw_fixtures.parquet"
+
+COLUMN_DTYPES = {
+    "fixture": "string",
+    "match_xg": "float64",
+    "ex_bookings": "float64",
+    "ex_corners": "float64",
+    "league": "category",
+}
+
+def convert():
+    """Converts the GW fixtures Excel file to Parquet so the dashboard can load it quickly."""
+    df = pd.read_excel(SOURCE_FILE, usecols=list(COLUMN_DTYPES), dtype=COLUMN_DTYPES, engine="calamine")
+    df.to_parquet(TARGET_FILE, engine="pyarrow", index=False)
+    return df
+
+if __name__ == '__main__':
+    df = convert()
+    print(f"Wrote {len(df)} rows from {SOURCE_FILE} to {TARGET_FILE}")
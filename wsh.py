@@ -1,53 +1,80 @@
+from datetime import datetime
+
 import pandas as pd
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from convert_data import TARGET_FILE as DATA_FILE
+
+# Switch scatter plots to WebGL once there are enough points for SVG to lag
+MIN_SCATTERGL_ROWS = 1000
+# Only the highest-xG fixtures are drawn in the bar chart; the Data View has the rest
+MAX_BAR_FIXTURES = 50
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def load_data():
-    """Loads the GW data from an Excel file and returns it as a pandas dataframe."""
-    df = pd.read_excel("current_gw_fixtures.xlsx")
-    return df
-
-def style_dataframe(df):
-    """Applies conditional formatting to the dataframe."""
-    # Create a copy of the dataframe without the league column for display
-    display_df = df[['fixture', 'match_xg', 'ex_bookings', 'ex_corners']].copy()
-    
-    def color_odds(val):
-        if val > 5:
-            color = 'background-color: #7A1CAC; color: white'
-        elif val > 3:
-            color = 'background-color: #7A1CAC; color: white'
-        else:
-            color = 'background-color: #7A1CAC; color: white'
-        return color
-
-    return display_df.style.applymap(color_odds, subset=['match_xg', 'ex_bookings', 'ex_corners'])
+    """Loads the GW data from a Parquet file and returns it as a pandas dataframe,
+    together with a dict mapping each league to the row positions of its matches.
+
+    The Parquet file is generated from the Excel fixtures by convert_data.py.
+    Cached across reruns, so treat the returned dataframe as read-only.
+    """
+    df = pd.read_parquet(DATA_FILE, engine="pyarrow", dtype_backend="pyarrow")
+    # The pyarrow backend reads league as a dictionary column; use a sorted pandas Categorical instead
+    df['league'] = pd.Categorical(df['league'], categories=sorted(df['league'].dropna().unique()),
+                                  ordered=True)
+    # Built here so the row positions always match the cached dataframe
+    league_index = df.groupby('league', sort=False, observed=True).indices
+    return df, league_index
+
+def filter_by_league(data, league_index, selected_league):
+    """Returns the matches for the selected league, or all matches for 'All'."""
+    if selected_league == 'All':
+        return data
+    return data.take(league_index[selected_league])
 
+def _stats_kernel(arr):
+    """Returns the column means of an (N, 3) xG/bookings/corners array plus the
+    position and value of the highest xG."""
+    means = np.nanmean(arr, axis=0)
+    imax = int(np.nanargmax(arr[:, 0]))
+    return means[0], means[1], means[2], imax, arr[imax, 0]
+
+@st.cache_data(show_spinner=False)
 def get_statistics(df):
     """Calculates basic statistics from the dataframe."""
+    # Reduce the three numeric columns together in a single (N, 3) array
+    arr = df[['match_xg', 'ex_bookings', 'ex_corners']].to_numpy(dtype=np.float64, na_value=np.nan)
+    avg_xg, avg_bookings, avg_corners, imax, max_xg = _stats_kernel(arr)
     stats = {
-        'avg_match_xg': round(df['match_xg'].mean(), 2),
-        'avg_bookings': round(df['ex_bookings'].mean(), 2),
-        'avg_corners': round(df['ex_corners'].mean(), 2),
-        'highest_xg_match': df.loc[df['match_xg'].idxmax(), 'fixture'],
-        'highest_xg_value': round(df['match_xg'].max(), 2)
+        'avg_match_xg': round(float(avg_xg), 2),
+        'avg_bookings': round(float(avg_bookings), 2),
+        'avg_corners': round(float(avg_corners), 2),
+        'highest_xg_match': df['fixture'].iat[imax],
+        'highest_xg_value': round(float(max_xg), 2)
     }
     return stats
 
+@st.cache_data(show_spinner=False)
+def _slider_bounds(df):
+    """Returns (min_xg, max_xg, min_bookings, max_bookings) for the filter sliders."""
+    arr = df[['match_xg', 'ex_bookings']].to_numpy(dtype=np.float64, na_value=np.nan)
+    lows, highs = np.nanmin(arr, axis=0), np.nanmax(arr, axis=0)
+    return float(lows[0]), float(highs[0]), float(lows[1]), float(highs[1])
+
 def add_search_filters(data):
     """Add search and filter options in sidebar"""
     st.sidebar.subheader("Filters")
     
-    min_xg = st.sidebar.slider("Min Expected Goals", 
-                              float(data['match_xg'].min()), 
-                              float(data['match_xg'].max()),
-                              float(data['match_xg'].min()))
+    xg_min, xg_max, bookings_min, bookings_max = _slider_bounds(data)
+    
+    min_xg = st.sidebar.slider("Min Expected Goals", xg_min, xg_max, xg_min)
     
-    min_bookings = st.sidebar.slider("Min Expected Bookings",
-                                    float(data['ex_bookings'].min()),
-                                    float(data['ex_bookings'].max()),
-                                    float(data['ex_bookings'].min()))
+    min_bookings = st.sidebar.slider("Min Expected Bookings", bookings_min, bookings_max, bookings_min)
     
     filtered_data = data[
         (data['match_xg'] >= min_xg) &
@@ -56,6 +83,14 @@ def add_search_filters(data):
     
     return filtered_data
 
+def rank_against_mean(data, column, above=True):
+    """Returns fixture/column rows above (or below) the column mean, highest first."""
+    values = data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    mean = np.nanmean(values)
+    idx = np.flatnonzero(values > mean if above else values < mean)
+    order = idx[np.argsort(-values[idx], kind='stable')]
+    return data[['fixture', column]].iloc[order]
+
 def add_insights(data):
     """Add statistical insights and analysis"""
     
@@ -64,28 +99,24 @@ def add_insights(data):
     
     with col1:
         st.markdown("**High Impact Matches (Above Average xG)**")
-        high_xg = data[data['match_xg'] > data['match_xg'].mean()]
-        st.dataframe(high_xg[['fixture', 'match_xg']].sort_values('match_xg', ascending=False),
-                     hide_index=True)
+        st.dataframe(rank_against_mean(data, 'match_xg'), hide_index=True)
     
     with col2:
         st.markdown("**High Card Potential (Above Average Bookings)**")
-        high_cards = data[data['ex_bookings'] > data['ex_bookings'].mean()]
-        st.dataframe(high_cards[['fixture', 'ex_bookings']].sort_values('ex_bookings', ascending=False),
-                     hide_index=True)
+        st.dataframe(rank_against_mean(data, 'ex_bookings'), hide_index=True)
         
     with col3:
         st.markdown("**High Corners Potential (Above Average Corners)**")
-        high_corners = data[data['ex_corners'] < data['ex_corners'].mean()]
-        st.dataframe(high_corners[['fixture', 'ex_corners']].sort_values('ex_corners', ascending=False), 
-                        hide_index=True)
+        st.dataframe(rank_against_mean(data, 'ex_corners', above=False), hide_index=True)
         # st.dataframe(styled_df, hide_index=True, height=560, use_container_width=True)
 
 
+@st.cache_data(show_spinner=False)
 def create_visualizations(df):
     """Creates visualization charts for the data."""
     # Expected Goals Bar Chart
-    fig_xg = px.bar(df, x='fixture', y='match_xg', 
+    bar_df = df.nlargest(MAX_BAR_FIXTURES, 'match_xg') if len(df) > MAX_BAR_FIXTURES else df
+    fig_xg = px.bar(bar_df, x='fixture', y='match_xg', 
                     title='Expected Goals by Match',
                     labels={'match_xg': 'Expected Goals', 'fixture': 'Match'},
                     color='match_xg',
@@ -98,15 +129,27 @@ def create_visualizations(df):
                             text='fixture',
                             size='match_xg',
                             color='match_xg',
-                            color_continuous_scale='Viridis')
+                            color_continuous_scale='Viridis',
+                            render_mode='webgl' if len(df) > MIN_SCATTERGL_ROWS else 'auto')
     
     # Bookings Distribution
-    fig_bookings = px.histogram(df, x='ex_bookings',
-                               title='Distribution of Expected Bookings',
-                               nbins=10)
+    # Bin on the server so plotly only receives the bar heights
+    bookings = df['ex_bookings'].to_numpy(dtype=np.float64, na_value=np.nan)
+    counts, edges = np.histogram(bookings[~np.isnan(bookings)], bins=10)
+    fig_bookings = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts,
+                                    width=np.diff(edges), name='ex_bookings'))
+    fig_bookings.update_layout(title='Distribution of Expected Bookings',
+                               xaxis_title='ex_bookings', yaxis_title='count', bargap=0)
     
     return fig_xg, fig_scatter, fig_bookings
 
+@st.cache_data(show_spinner=False)
+def _csv_bytes(df):
+    """Encodes the dataframe as CSV bytes using pyarrow's CSV writer."""
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue().to_pybytes()
+
 def add_coming_soon_section():
     """Add a coming soon section with upcoming features"""
     st.sidebar.markdown("---")
@@ -141,13 +184,13 @@ def main():
     st.title('Betting Odds Dashboard')
     
     # Load data
-    data = load_data()
+    data, league_index = load_data()
     
     # Add league filter with proper styling
     st.sidebar.header("League Filters")
     
-    # Get unique leagues and sort them
-    leagues = ['All'] + sorted(data['league'].unique().tolist())
+    # League categories are already sorted at load time
+    leagues = ['All', *data['league'].cat.categories]
     
     # Create a more prominent league selector
     selected_league = st.sidebar.selectbox(
@@ -158,11 +201,10 @@ def main():
     )
     
     # Filter data based on league selection
+    filtered_data = filter_by_league(data, league_index, selected_league)
     if selected_league != 'All':
-        filtered_data = data[data['league'] == selected_league]
         st.sidebar.info(f"Showing {len(filtered_data)} matches from {selected_league}")
     else:
-        filtered_data = data
         st.sidebar.info(f"Showing all {len(data)} matches")
         
     # Add league summary
@@ -190,26 +232,32 @@ def main():
     tab1, tab2, tab3 = st.tabs(["Data View", "Visualizations", "Insights"])
     
     with tab1:
-        styled_df = style_dataframe(filtered_data)
-        st.dataframe(styled_df, hide_index=True, height=560, use_container_width=True)
+        display_df = filtered_data[['fixture', 'match_xg', 'ex_bookings', 'ex_corners']]
+        column_config = {
+            col: st.column_config.ProgressColumn(col, format='%.2f', min_value=0,
+                                                 max_value=float(display_df[col].max()))
+            for col in ['match_xg', 'ex_bookings', 'ex_corners']
+        }
+        st.dataframe(display_df, column_config=column_config, hide_index=True, height=560,
+                     use_container_width=True)
     
     with tab2:
         fig_xg, fig_scatter, fig_bookings = create_visualizations(filtered_data)
-        st.plotly_chart(fig_xg, use_container_width=True)
+        st.plotly_chart(fig_xg, use_container_width=True, key='fig_xg')
         col1, col2 = st.columns(2)
         with col1:
-            st.plotly_chart(fig_scatter, use_container_width=True)
+            st.plotly_chart(fig_scatter, use_container_width=True, key='fig_scatter')
         with col2:
-            st.plotly_chart(fig_bookings, use_container_width=True)
+            st.plotly_chart(fig_bookings, use_container_width=True, key='fig_bookings')
     
     with tab3:
         add_insights(filtered_data)
     
     # Download button for filtered data
-    csv = filtered_data.to_csv(index=False).encode('utf-8')
+    # Only encoded once the button is clicked
     st.download_button(
         "Download Filtered Data",
-        csv,
+        lambda: _csv_bytes(filtered_data),
         "filtered_odds_data.csv",
         "text/csv",
         key='download-csv'
@@ -217,7 +265,7 @@ def main():
     
     # Add footer with timestamp
     st.markdown("---")
-    st.caption(f"Last updated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    st.caption(f"Last updated: {datetime.now():%Y-%m-%d %H:%M:%S}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file